@@ -0,0 +1,163 @@
+import copy
+import numpy as np
+import scipy.sparse as sp
+
+# Try to import CuPy for GPU predictions, but continue without it if not available
+try:
+    import cupy
+    GPU_AVAILABLE = cupy.cuda.runtime.getDeviceCount() > 0
+except (ImportError, RuntimeError):
+    GPU_AVAILABLE = False
+
+class CompactForest:
+    """RandomForest predictor that walks every tree at once over flat float32 node arrays
+
+    Nodes of all trees are concatenated in preorder, so an internal node's left
+    child is always the next node and only right children need to be stored.
+    Leaves have a threshold of -inf and point to themselves on the right, which
+    lets every tree take the same number of steps.
+    """
+
+    # Array module holding the node arrays: NumPy, or CuPy after to_gpu()
+    xp = np
+
+    def __init__(self, classes, n_features, columns, roots, feature, threshold, right, value, max_depth):
+        self.classes_ = classes
+        self.n_features_in_ = n_features
+        self.columns = columns
+        self.roots = roots
+        self.feature = feature
+        self.threshold = threshold
+        self.right = right
+        self.value = value
+        self.max_depth = max_depth
+
+        # Position of each input column among the columns the trees use, or -1
+        self.column_map = np.full(n_features, -1, dtype=np.intp)
+        self.column_map[columns] = np.arange(len(columns))
+
+    @classmethod
+    def from_sklearn(cls, clf):
+        """Flatten the trees of a fitted RandomForestClassifier"""
+        trees = [estimator.tree_ for estimator in clf.estimators_]
+        return cls.from_arrays(
+            clf.classes_,
+            clf.n_features_in_,
+            [tree.children_left for tree in trees],
+            [tree.children_right for tree in trees],
+            [tree.feature for tree in trees],
+            [tree.threshold for tree in trees],
+            [tree.value[:, 0, :] for tree in trees]
+        )
+
+    @classmethod
+    def from_arrays(cls, classes, n_features, children_left, children_right, feature, threshold, value):
+        """Build the flat layout from per-tree node arrays in sklearn's Tree format"""
+        trees = [
+            _preorder(*arrays)
+            for arrays in zip(children_left, children_right, feature, threshold, value)
+        ]
+        offsets = np.cumsum([0] + [len(tree[0]) for tree in trees])
+        roots = offsets[:-1].astype(np.intp)
+        left = np.concatenate([tree[0] for tree in trees]).astype(np.intp)
+        right = np.concatenate([tree[1] for tree in trees]).astype(np.intp)
+        feature = np.concatenate([tree[2] for tree in trees]).astype(np.intp)
+        threshold = np.concatenate([tree[3] for tree in trees]).astype(np.float64)
+        value = np.concatenate([tree[4] for tree in trees]).astype(np.float64)
+
+        # Child indices are per tree; shift them into the concatenated arrays
+        is_leaf = left < 0
+        nodes = np.arange(len(left))
+        right = np.where(is_leaf, nodes, right + np.repeat(roots, np.diff(offsets)))
+
+        # Only keep the input columns some split actually looks at
+        columns, feature[~is_leaf] = np.unique(feature[~is_leaf], return_inverse=True)
+        feature[is_leaf] = 0
+
+        # sklearn compares float32 inputs against float64 thresholds. Rounding each
+        # threshold down to the nearest float32 keeps every decision identical.
+        threshold32 = threshold.astype(np.float32)
+        too_high = threshold32 > threshold
+        threshold32[too_high] = np.nextafter(threshold32[too_high], np.float32(-np.inf))
+        threshold32[is_leaf] = -np.inf
+
+        # Leaves store class counts (or fractions); predict_proba averages them as fractions
+        totals = value.sum(axis=1, keepdims=True)
+        totals[totals == 0] = 1
+        value = (value / totals).astype(np.float32)
+
+        # The deepest tree bounds how many steps any sample needs to reach a leaf
+        max_depth = 0
+        frontier = roots
+        while True:
+            frontier = frontier[~is_leaf[frontier]]
+            if not len(frontier):
+                break
+            max_depth += 1
+            frontier = np.concatenate([frontier + 1, right[frontier]])
+
+        return cls(np.asarray(classes), n_features, columns.astype(np.intp), roots,
+                   feature.astype(np.int32), threshold32, right.astype(np.int32), value, max_depth)
+
+    def to_gpu(self):
+        """Copy of this forest that walks the trees on the GPU with CuPy"""
+        forest = copy.copy(self)
+        for name in ('roots', 'feature', 'threshold', 'right', 'value'):
+            setattr(forest, name, cupy.asarray(getattr(self, name)))
+        forest.xp = cupy
+        return forest
+
+    def predict_proba(self, X):
+        """Average class probabilities over all trees, like RandomForestClassifier.predict_proba"""
+        xp = self.xp
+        X = xp.asarray(self._used_columns(X))
+        n_samples, width = X.shape
+
+        values = X.ravel()
+        starts = (xp.arange(n_samples, dtype=np.intp) * width)[:, np.newaxis]
+        node = xp.broadcast_to(self.roots, (n_samples, len(self.roots)))
+        for _ in range(self.max_depth):
+            go_left = values[starts + self.feature[node]] <= self.threshold[node]
+            node = xp.where(go_left, node + 1, self.right[node])
+
+        probabilities = self.value.take(node, axis=0).sum(axis=1, dtype=np.float64) / len(self.roots)
+        return probabilities if xp is np else cupy.asnumpy(probabilities)
+
+    def _used_columns(self, X):
+        """Dense float32 copy of just the input columns the trees split on"""
+        if not sp.issparse(X):
+            return np.ascontiguousarray(np.asarray(X)[:, self.columns], dtype=np.float32)
+
+        X = sp.csr_matrix(X)
+        positions = self.column_map[X.indices]
+        rows = np.repeat(np.arange(X.shape[0]), np.diff(X.indptr))
+        used = positions >= 0
+
+        dense = np.zeros((X.shape[0], len(self.columns)), dtype=np.float32)
+        dense[rows[used], positions[used]] = X.data[used]
+        return dense
+
+def _preorder(left, right, feature, threshold, value):
+    """Renumber a tree's nodes so every left child directly follows its parent"""
+    left = np.asarray(left)
+    internal = left >= 0
+    if (left[internal] == np.flatnonzero(internal) + 1).all():
+        return left, np.asarray(right), np.asarray(feature), np.asarray(threshold), np.asarray(value)
+
+    order = []
+    stack = [0]
+    while stack:
+        node = stack.pop()
+        order.append(node)
+        if left[node] >= 0:
+            stack.append(right[node])
+            stack.append(left[node])
+
+    order = np.array(order)
+    new_index = np.empty(len(left), dtype=np.intp)
+    new_index[order] = np.arange(len(order))
+    left, right = left[order], np.asarray(right)[order]
+    internal = left >= 0
+    left[internal] = new_index[left[internal]]
+    right[internal] = new_index[right[internal]]
+    return left, right, np.asarray(feature)[order], np.asarray(threshold)[order], np.asarray(value)[order]
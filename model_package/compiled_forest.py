@@ -0,0 +1,33 @@
+import numpy as np
+
+# Try to import treelite, but continue without it if not available
+try:
+    import tl2cgen
+    import treelite
+    TREELITE_AVAILABLE = True
+except ImportError:
+    TREELITE_AVAILABLE = False
+
+class CompiledForest:
+    """RandomForest predictor backed by a shared library generated with treelite"""
+
+    def __init__(self, libpath, classes):
+        self.classes_ = np.asarray(classes)
+        self.predictor = tl2cgen.Predictor(libpath, verbose=False)
+        self.n_features_in_ = self.predictor.num_feature
+
+    def predict_proba(self, X):
+        """Average class probabilities over all trees, like RandomForestClassifier.predict_proba"""
+        probabilities = self.predictor.predict(tl2cgen.DMatrix(X))
+        return probabilities.reshape(X.shape[0], len(self.classes_))
+
+def compile_forest(clf, libpath='rf_classifier.so'):
+    """Generate C code for every tree of a fitted RandomForestClassifier and build it into a shared library"""
+    model = treelite.sklearn.import_model(clf)
+    tl2cgen.export_lib(
+        model,
+        toolchain='gcc',
+        libpath=libpath,
+        params={'parallel_comp': 32, 'quantize': 1},
+        verbose=False
+    )
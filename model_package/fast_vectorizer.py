@@ -0,0 +1,95 @@
+import math
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.utils import murmurhash3_32
+
+# Token pattern under which a word of preprocess_text output is a token
+# exactly when it has at least two letters
+_DEFAULT_TOKEN_PATTERN = r"(?u)\b\w\w+\b"
+
+class FastVectorizer:
+    """TF-IDF transform for text cleaned by preprocess_text, built straight into a CSR matrix
+
+    preprocess_text leaves only lowercase a-z words separated by single spaces,
+    so tokenizing is a split() and the per-document work is one dict (or hash)
+    lookup per term. The result matches the sklearn vectorizer it was built from.
+    """
+
+    def __init__(self, ngram_range, idf, n_features, vocabulary=None):
+        self.ngram_range = ngram_range
+        self.idf = idf.tolist()
+        self.n_features = n_features
+        # Without a vocabulary, terms are hashed like HashingVectorizer does
+        self.vocabulary = vocabulary
+
+    @classmethod
+    def from_sklearn(cls, vectorizer):
+        """Build from a fitted TfidfVectorizer or make_hashing_vectorizer() pipeline,
+        or return None if its settings need sklearn's own transform"""
+        if isinstance(vectorizer, TfidfVectorizer):
+            words, tfidf = vectorizer, vectorizer
+        else:
+            words, tfidf = vectorizer.named_steps['hashing'], vectorizer.named_steps['tfidf']
+            if words.alternate_sign or words.norm is not None:
+                return None
+
+        if (words.analyzer != 'word' or words.preprocessor is not None or words.tokenizer is not None
+                or words.token_pattern != _DEFAULT_TOKEN_PATTERN or words.stop_words is not None
+                or words.binary or tfidf.norm != 'l2' or not tfidf.use_idf or tfidf.sublinear_tf):
+            return None
+
+        if words is tfidf:
+            return cls(words.ngram_range, tfidf.idf_, len(words.vocabulary_), words.vocabulary_)
+        return cls(words.ngram_range, tfidf.idf_, words.n_features)
+
+    def transform(self, processed_texts):
+        """TF-IDF CSR matrix (float64, L2-normalized rows) for texts from preprocess_text"""
+        min_n, max_n = self.ngram_range
+        vocabulary = self.vocabulary
+        idf = self.idf
+
+        indptr = [0]
+        indices = []
+        data = []
+        for text in processed_texts:
+            tokens = [token for token in text.split() if len(token) > 1]
+
+            # Same n-gram order as sklearn's _word_ngrams
+            terms = tokens if min_n == 1 else []
+            for n in range(max(min_n, 2), min(max_n, len(tokens)) + 1):
+                terms = terms + [' '.join(tokens[i:i + n]) for i in range(len(tokens) - n + 1)]
+
+            counts = {}
+            for term in terms:
+                index = vocabulary.get(term) if vocabulary is not None else self._hash(term)
+                if index is not None:
+                    counts[index] = counts.get(index, 0) + 1
+
+            # Scale by IDF and L2-normalize. sklearn sums the squares in the order the
+            # IDF product leaves the columns (descending), so do the same to get
+            # bit for bit the same values.
+            row_indices = sorted(counts)
+            row_data = [counts[index] * idf[index] for index in row_indices]
+            norm = 0.0
+            for value in reversed(row_data):
+                norm += value * value
+            if norm > 0:
+                norm = math.sqrt(norm)
+                row_data = [value / norm for value in row_data]
+
+            indices.extend(row_indices)
+            data.extend(row_data)
+            indptr.append(len(indices))
+
+        return sp.csr_matrix(
+            (np.array(data, dtype=np.float64), np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int32)),
+            shape=(len(indptr) - 1, self.n_features)
+        )
+
+    def _hash(self, term):
+        """Column HashingVectorizer (via FeatureHasher) assigns to a term"""
+        h = murmurhash3_32(term, seed=0)
+        if h == -2 ** 31:
+            return (2 ** 31 - 1 - (self.n_features - 1)) % self.n_features
+        return abs(h) % self.n_features
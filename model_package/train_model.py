@@ -1,6 +1,6 @@
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import cross_val_score, train_test_split
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import Dense, Dropout
 from tensorflow.keras.optimizers import Adam
@@ -14,6 +14,9 @@ import nltk
 from nltk.corpus import stopwords
 from nltk.tokenize import word_tokenize
 import pickle
+import joblib
+from compiled_forest import TREELITE_AVAILABLE, compile_forest
+from model_io import load_label_encoder, load_vectorizer, make_hashing_vectorizer, save_forest, save_label_encoder, save_vectorizer
 from sentence_transformers import SentenceTransformer
 from sklearn.linear_model import LogisticRegression
 from sklearn.ensemble import RandomForestClassifier
@@ -580,8 +583,7 @@ def fine_tune_transformer_model():
     tokenizer.save_pretrained(model_dir)
     
     # Save label encoder
-    with open('label_encoder.pkl', 'wb') as f:
-        pickle.dump(label_encoder, f)
+    save_label_encoder(label_encoder)
     
     # Save configuration
     config = {
@@ -612,14 +614,42 @@ def fine_tune_transformer_model():
     
     return model, tokenizer, label_encoder, config
 
+def train_pruned_forest(X_train, y_train, ccp_alphas=(0.0, 1e-4, 1e-3, 1e-2), tolerance=0.005):
+    """Train a RandomForest for each pruning strength and keep the smallest one
+    whose cross-validated accuracy is within tolerance of the best"""
+    candidates = []
+    for ccp_alpha in ccp_alphas:
+        clf = RandomForestClassifier(
+            n_estimators=200,
+            class_weight='balanced',
+            ccp_alpha=ccp_alpha,
+            n_jobs=-1,
+            random_state=42
+        )
+        cv_accuracy = cross_val_score(clf, X_train, y_train, cv=3).mean()
+        clf.fit(X_train, y_train)
+        
+        # Prediction cost grows with the number of nodes walked per tree
+        node_count = sum(estimator.tree_.node_count for estimator in clf.estimators_)
+        print(f"  ccp_alpha={ccp_alpha}: CV accuracy {cv_accuracy:.2%}, {node_count} nodes")
+        candidates.append((clf, cv_accuracy, node_count))
+    
+    best_accuracy = max(cv_accuracy for _, cv_accuracy, _ in candidates)
+    clf, cv_accuracy, node_count = min(
+        (candidate for candidate in candidates if candidate[1] >= best_accuracy - tolerance),
+        key=lambda candidate: candidate[2]
+    )
+    print(f"Selected ccp_alpha={clf.ccp_alpha} ({node_count} nodes)")
+    
+    return clf
+
 def predict_section(text, model_dir="./legal_model"):
     """Make a prediction using the saved transformer model"""
     # Load components
     tokenizer = AutoTokenizer.from_pretrained(model_dir)
     model = AutoModelForSequenceClassification.from_pretrained(model_dir)
     
-    with open('label_encoder.pkl', 'rb') as f:
-        label_encoder = pickle.load(f)
+    label_encoder = load_label_encoder()
     
     # Preprocess
     processed_text = preprocess_text(text)
@@ -654,23 +684,18 @@ def predict_section(text, model_dir="./legal_model"):
     
     return section, confidence
 
-def predict_section_rf(text, model_path='rf_classifier.pkl', vectorizer_path='tfidf_vectorizer.pkl', encoder_path='label_encoder.pkl'):
+def predict_section_rf(text, model_path='rf_classifier.pkl', vectorizer_path='tfidf_vectorizer.json', encoder_path='label_encoder.json'):
     """Make a prediction using the RandomForest model"""
     # Load components
-    with open(model_path, 'rb') as f:
-        clf = pickle.load(f)
-    
-    with open(vectorizer_path, 'rb') as f:
-        vectorizer = pickle.load(f)
-    
-    with open(encoder_path, 'rb') as f:
-        label_encoder = pickle.load(f)
+    clf = joblib.load(model_path)
+    vectorizer = load_vectorizer(vectorizer_path)
+    label_encoder = load_label_encoder(encoder_path)
     
     # Preprocess
     processed_text = preprocess_text(text)
     
     # Vectorize
-    features = vectorizer.transform([processed_text]).toarray()
+    features = vectorizer.transform([processed_text])
     
     # Predict
     prediction = clf.predict(features)[0]
@@ -699,10 +724,10 @@ if __name__ == "__main__":
             # Preprocess text
             df['processed_text'] = df['text'].apply(preprocess_text)
             
-            # Use basic TF-IDF vectorization
-            from sklearn.feature_extraction.text import TfidfVectorizer
-            vectorizer = TfidfVectorizer(max_features=5000, ngram_range=(1, 2))
-            X = vectorizer.fit_transform(df['processed_text']).toarray()
+            # Use TF-IDF over hashed terms; the sparse matrix is passed to the
+            # forest as is, since 2**18 hashed columns would not fit densely
+            vectorizer = make_hashing_vectorizer()
+            X = vectorizer.fit_transform(df['processed_text'])
             
             # Encode labels
             label_encoder = LabelEncoder()
@@ -713,14 +738,8 @@ if __name__ == "__main__":
                 X, y, test_size=0.2, random_state=42, stratify=y
             )
             
-            # Train RandomForest
-            clf = RandomForestClassifier(
-                n_estimators=200, 
-                class_weight='balanced',
-                n_jobs=-1,
-                random_state=42
-            )
-            clf.fit(X_train, y_train)
+            # Train RandomForest, pruned as far as accuracy allows
+            clf = train_pruned_forest(X_train, y_train)
             
             # Evaluate
             y_pred = clf.predict(X_test)
@@ -728,14 +747,13 @@ if __name__ == "__main__":
             print(f"\nRandom Forest accuracy: {accuracy:.2%}")
             
             # Save components
-            with open('rf_classifier.pkl', 'wb') as f:
-                pickle.dump(clf, f)
+            joblib.dump(clf, 'rf_classifier.pkl', protocol=pickle.HIGHEST_PROTOCOL)
+            save_forest(clf)
+            if TREELITE_AVAILABLE:
+                compile_forest(clf)
             
-            with open('tfidf_vectorizer.pkl', 'wb') as f:
-                pickle.dump(vectorizer, f)
-                
-            with open('label_encoder.pkl', 'wb') as f:
-                pickle.dump(label_encoder, f)
+            save_vectorizer(vectorizer)
+            save_label_encoder(label_encoder)
             
             # Save config
             config = {
@@ -754,7 +772,7 @@ if __name__ == "__main__":
             # Define simple prediction function
             def predict_section_rf(text):
                 processed_text = preprocess_text(text)
-                features = vectorizer.transform([processed_text]).toarray()
+                features = vectorizer.transform([processed_text])
                 prediction = clf.predict(features)[0]
                 proba = clf.predict_proba(features)[0]
                 confidence = proba[prediction]
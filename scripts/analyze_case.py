@@ -1,190 +1,294 @@
-import tensorflow as tf
-import numpy as np
+import functools
 import json
+import os
 import re
-import pickle
-from sklearn.feature_extraction.text import TfidfVectorizer
+import threading
+
+# NumPy, scikit-learn and the model files are only needed once a case is
+# analyzed, so they are imported and loaded lazily (see _load_artifacts)
+
+# Patterns used on every analysis, compiled once at import
+_NONALPHA = re.compile(r'[^a-zA-Z\s]')
+_PERSON = re.compile(r'(person\s+[A-Za-z]|[A-Za-z]+\s+[A-Za-z]+)', re.IGNORECASE)
+_PERSON_A = re.compile(r'person\s+a', re.IGNORECASE)
+_PERSON_B = re.compile(r'person\s+b', re.IGNORECASE)
+_PERSON_C = re.compile(r'person\s+c', re.IGNORECASE)
+# re.ASCII keeps case folding to A-Z, matching what lower() does for these letters
+_SELF_DEFENSE = re.compile(r'self[- ]defense', re.IGNORECASE | re.ASCII)
+
+# Smallest batch worth copying to the GPU when analyze_cases is left to choose
+GPU_MIN_BATCH = 1000
+
+# Smallest batch worth the cost of sending it to worker processes, and the
+# number of cases each worker vectorizes at a time
+PARALLEL_MIN_BATCH = 2000
+PARALLEL_CHUNK_SIZE = 64
+
+# Lowercases A-Z and turns anything other than a-z or whitespace into a space
+_ASCII_CLEAN = {code: _NONALPHA.sub(' ', chr(code).lower()) for code in range(128)}
 
 def preprocess_text(text):
     """Clean and preprocess text"""
-    # Convert to lowercase
-    text = text.lower()
-    # Remove special characters but keep spaces between words
-    text = re.sub(r'[^a-zA-Z\s]', ' ', text)
+    if text.isascii():
+        # Lowercase and remove special characters in a single translate pass
+        text = text.translate(_ASCII_CLEAN)
+    else:
+        # translate() loses its fast path on non-ASCII input, where the regex is quicker
+        text = _NONALPHA.sub(' ', text.lower())
     # Remove extra whitespace
-    text = ' '.join(text.split())
-    return text
+    return ' '.join(text.split())
+
+_load_lock = threading.Lock()
+
+def _load_artifacts():
+    """Load the RandomForest model and its components once per process"""
+    # A case submitted while the warm-up thread is still loading waits for it
+    # here instead of loading everything a second time
+    with _load_lock:
+        return _read_artifacts()
+
+def _warm_up():
+    """Load the model in the background while the user types their first case"""
+    try:
+        _load_artifacts()
+    except Exception:
+        # analyze_cases reports the error once a case is submitted
+        pass
+
+@functools.lru_cache(maxsize=1)
+def _read_artifacts():
+    from compiled_forest import TREELITE_AVAILABLE, CompiledForest
+    from fast_vectorizer import FastVectorizer
+    from model_io import load_forest, load_forest_manifest, load_label_encoder, load_vectorizer
+    
+    if TREELITE_AVAILABLE and _is_up_to_date('rf_classifier.so', 'rf_forest.safetensors'):
+        # Native code generated from the trees by `python model_io.py`
+        clf = CompiledForest('rf_classifier.so', load_forest_manifest()['classes_'])
+    else:
+        # Predict from flat float32 copies of the trees, which gives the same
+        # probabilities as sklearn with half the bytes per threshold
+        clf = load_forest()
+    
+    # Every artifact is plain data stored as JSON and safetensors, so loading
+    # the model never unpickles (and so never runs) anything
+    vectorizer = load_vectorizer()
+    label_encoder = load_label_encoder()
+    
+    # Texts reach the vectorizer already cleaned by preprocess_text, which lets
+    # FastVectorizer skip sklearn's regex tokenizer and build the CSR matrix itself
+    vectorizer = FastVectorizer.from_sklearn(vectorizer) or vectorizer
+    
+    # IPC section for each predict_proba column, so a prediction is a plain
+    # array lookup instead of a label_encoder.inverse_transform() call
+    sections = label_encoder.classes_[clf.classes_]
+    
+    with open('model_config.json', 'r') as f:
+        config = json.load(f)
+    
+    return clf, vectorizer, sections, config
+
+@functools.lru_cache(maxsize=1)
+def _load_gpu_forest():
+    """Load the RandomForest once more with its node arrays copied to the GPU"""
+    from model_io import load_forest
+    
+    return load_forest().to_gpu()
+
+@functools.lru_cache(maxsize=1)
+def _process_pool():
+    """Start one worker process per CPU for vectorizing large batches"""
+    import atexit
+    from concurrent.futures import ProcessPoolExecutor
+    
+    pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+    # Stop the workers before interpreter teardown rather than during it
+    atexit.register(pool.shutdown)
+    return pool
+
+def _vectorize_cases(case_texts):
+    """Preprocess and vectorize case texts into the float32 matrix the forest compares against"""
+    import numpy as np
+    
+    _, vectorizer, _, _ = _load_artifacts()
+    processed_texts = [preprocess_text(case_text) for case_text in case_texts]
+    return vectorizer.transform(processed_texts).astype(np.float32)
+
+def _is_up_to_date(path, source_path):
+    """Check that a file generated from source_path exists and is newer than it"""
+    return os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(source_path)
 
 def analyze_case(case_text):
     """Analyze a legal case and identify relevant IPC sections with detailed explanation"""
+    return analyze_cases([case_text])[0]
+
+def analyze_cases(case_texts, backend='auto'):
+    """Analyze several legal cases, vectorizing and classifying them as one batch
+
+    backend is 'cpu', 'gpu', or 'auto' to use the GPU for batches of at least
+    GPU_MIN_BATCH cases. Without CuPy and a CUDA device the CPU is always used.
+    On machines with several CPUs, batches of at least PARALLEL_MIN_BATCH cases
+    are preprocessed and vectorized in worker processes.
+    """
+    if not case_texts:
+        return []
+    
     try:
-        # Load the RandomForest model and its components
-        with open('rf_classifier.pkl', 'rb') as f:
-            clf = pickle.load(f)
+        import numpy as np
+        from compact_forest import GPU_AVAILABLE
         
-        with open('tfidf_vectorizer.pkl', 'rb') as f:
-            vectorizer = pickle.load(f)
-            
-        with open('label_encoder.pkl', 'rb') as f:
-            label_encoder = pickle.load(f)
-            
-        with open('model_config.json', 'r') as f:
-            config = json.load(f)
+        # Load the RandomForest model and its components (cached after the first call)
+        clf, _, section_by_column, config = _load_artifacts()
         
-        # Preprocess the case text
-        processed_text = preprocess_text(case_text)
+        if GPU_AVAILABLE and (backend == 'gpu' or (backend == 'auto' and len(case_texts) >= GPU_MIN_BATCH)):
+            clf = _load_gpu_forest()
         
-        # Vectorize the text
-        text_vector = vectorizer.transform([processed_text])
-        
-        # Get prediction and confidence
-        prediction = clf.predict(text_vector)[0]
-        probabilities = clf.predict_proba(text_vector)[0]
-        
-        # Get the IPC section from the prediction
-        section = label_encoder.inverse_transform([prediction])[0]
-        
-        # Find maximum probability directly instead of using index lookup
-        confidence = np.max(probabilities) * 100
+        if len(case_texts) >= PARALLEL_MIN_BATCH and (os.cpu_count() or 1) > 1:
+            import scipy.sparse as sp
+            
+            # Preprocessing and tokenizing are pure Python and hold the GIL, so
+            # large batches are split across processes and stacked back in order
+            chunks = [
+                case_texts[start:start + PARALLEL_CHUNK_SIZE]
+                for start in range(0, len(case_texts), PARALLEL_CHUNK_SIZE)
+            ]
+            text_vectors = sp.vstack(list(_process_pool().map(_vectorize_cases, chunks)), format='csr')
+        else:
+            text_vectors = _vectorize_cases(case_texts)
         
-        # Extract parties involved
-        parties = extract_parties(case_text)
+        # Get predictions and confidences from a single pass over the forest;
+        # predict() would walk every tree again just to take this argmax
+        probabilities = clf.predict_proba(text_vectors)
+        best = probabilities.argmax(axis=1)
+        sections = section_by_column[best]
+        confidences = probabilities[np.arange(len(case_texts)), best] * 100
         
-        # Create the analysis result
-        result = {
-            "case_text": case_text,
-            "predicted_section": section,
-            "confidence": confidence,
-            "parties": parties,
-            "explanation": get_section_explanation(section, case_text),
-            "recommendations": get_recommendations(confidence)
-        }
+        results = []
+        for case_text, section, confidence in zip(case_texts, sections, confidences):
+            # Create the analysis result
+            results.append({
+                "case_text": case_text,
+                "predicted_section": section,
+                "confidence": confidence,
+                "parties": extract_parties(case_text),
+                "explanation": get_section_explanation(section, case_text),
+                "recommendations": get_recommendations(confidence)
+            })
         
-        return result
+        return results
     except Exception as e:
-        return {
+        return [{
             "case_text": case_text,
             "error": str(e),
             "message": "An error occurred during analysis. Please check if all model files are available."
-        }
+        } for case_text in case_texts]
 
 def extract_parties(text):
     parties = []
-    person_pattern = r'(person\s+[A-Za-z]|[A-Za-z]+\s+[A-Za-z]+)'
-    matches = re.findall(person_pattern, text, re.IGNORECASE)
+    # Lowercased matches already added (or skipped), for O(1) duplicate checks
+    seen = {'person a', 'person b', 'person c'}
     
-    for match in matches:
-        if match.lower() not in ['person a', 'person b', 'person c']:
-            if match.lower() not in [p.lower() for p in parties]:
-                parties.append(match)
+    for match in _PERSON.findall(text):
+        match_lower = match.lower()
+        if match_lower not in seen:
+            seen.add(match_lower)
+            parties.append(match)
     
     # Add standard parties if detected
-    if re.search(r'person\s+a', text, re.IGNORECASE):
+    if _PERSON_A.search(text):
         parties.append("Person A")
-    if re.search(r'person\s+b', text, re.IGNORECASE):
+    if _PERSON_B.search(text):
         parties.append("Person B")
-    if re.search(r'person\s+c', text, re.IGNORECASE):
+    if _PERSON_C.search(text):
         parties.append("Person C")
     
     return parties
 
-def get_section_explanation(section, case_text):
-    # Check for special case scenarios
-    if "self-defense" in case_text.lower() or "self defense" in case_text.lower():
-        return get_self_defense_explanation(case_text)
-    elif "minimum wage" in case_text.lower() or "labor" in case_text.lower() or "employer" in case_text.lower():
-        return get_labor_law_explanation(case_text)
-    
-    # General section explanations
-    if section == "302":
-        return """Murder:
+# Explanations for the IPC sections the model can predict
+_EXPLANATIONS = {
+    "302": """Murder:
 - Punishment: Death or imprisonment for life, and fine
 - For proving murder, the prosecution must establish intention to cause death
-- The case must show premeditation or intention to cause bodily injury sufficient to cause death"""
-    
-    elif section == "304":
-        return """Culpable Homicide Not Amounting to Murder:
+- The case must show premeditation or intention to cause bodily injury sufficient to cause death""",
+
+    "304": """Culpable Homicide Not Amounting to Murder:
 - Punishment: Imprisonment for life, or up to 10 years, and fine
 - Applies when death is caused without the intention to cause death
-- May apply when the act is done with the knowledge that it is likely to cause death"""
-    
-    elif section == "304A":
-        return """Death by Negligence:
+- May apply when the act is done with the knowledge that it is likely to cause death""",
+
+    "304A": """Death by Negligence:
 - Punishment: Imprisonment up to 2 years, or fine, or both
 - Applies when death is caused by a rash or negligent act
-- No intention to cause death or knowledge that the act would likely cause death"""
-    
-    elif section == "308":
-        return """Attempt to Commit Culpable Homicide:
+- No intention to cause death or knowledge that the act would likely cause death""",
+
+    "308": """Attempt to Commit Culpable Homicide:
 - Punishment: Imprisonment up to 3 years, or fine, or both
 - Applies when an act is done with the intention of causing culpable homicide
-- The attempt does not result in death"""
-    
-    elif section == "319":
-        return """Hurt:
+- The attempt does not result in death""",
+
+    "319": """Hurt:
 - Punishment: Imprisonment up to 1 year, or fine up to 1,000 rupees, or both
 - Causing bodily pain, disease, or infirmity to any person
-- Includes physical injury that causes pain"""
-    
-    elif section == "320":
-        return """Grievous Hurt:
+- Includes physical injury that causes pain""",
+
+    "320": """Grievous Hurt:
 - Punishment: Imprisonment up to 7 years, and fine
-- Includes emasculation, permanent privation of sight or hearing, fracture or dislocation of bones, or any hurt which endangers life"""
-    
-    elif section == "376":
-        return """Rape:
+- Includes emasculation, permanent privation of sight or hearing, fracture or dislocation of bones, or any hurt which endangers life""",
+
+    "376": """Rape:
 - Punishment: Rigorous imprisonment for a term not less than 7 years, may extend to life, and fine
-- Sexual intercourse without consent or with consent obtained under fear, threat, or false promises"""
-    
-    elif section == "379":
-        return """Theft:
+- Sexual intercourse without consent or with consent obtained under fear, threat, or false promises""",
+
+    "379": """Theft:
 - Punishment: Imprisonment up to 3 years, or fine, or both
 - Involves dishonestly taking property without consent
-- Must be done with the intention to permanently deprive the owner of the property"""
-    
-    elif section == "392":
-        return """Robbery:
+- Must be done with the intention to permanently deprive the owner of the property""",
+
+    "392": """Robbery:
 - Punishment: Rigorous imprisonment up to 10 years, and fine
 - Theft with the use of force or fear of force
-- Includes attempt to cause death, hurt, or wrongful restraint to commit theft"""
-    
-    elif section == "420":
-        return """Cheating and Dishonestly Inducing Delivery of Property:
+- Includes attempt to cause death, hurt, or wrongful restraint to commit theft""",
+
+    "420": """Cheating and Dishonestly Inducing Delivery of Property:
 - Punishment: Imprisonment up to 7 years and fine
 - Involves fraudulent or deceptive practices resulting in wrongful gain
-- Must show intention to defraud from the beginning"""
-    
-    elif section == "499":
-        return """Defamation:
+- Must show intention to defraud from the beginning""",
+
+    "499": """Defamation:
 - Punishment: Simple imprisonment up to 2 years, or fine, or both
 - Making or publishing imputations concerning any person with intent to harm their reputation
-- Exceptions include truth for public good, fair comment on public conduct, etc."""
-    
-    elif section == "300":
-        return """Definition of Murder:
+- Exceptions include truth for public good, fair comment on public conduct, etc.""",
+
+    "300": """Definition of Murder:
 - When the act is done with the intention of causing death
 - When the act is done with the intention of causing bodily injury likely to cause death
-- When the act is done with the knowledge that it is likely to cause death"""
-    
-    elif section == "100":
-        return """Right of Private Defence of the Body Extending to Causing Death:
+- When the act is done with the knowledge that it is likely to cause death""",
+
+    "100": """Right of Private Defence of the Body Extending to Causing Death:
 - No punishment as it is a defense, not an offense
 - Applies when there is reasonable apprehension of death or grievous hurt
 - The threat must be immediate and not avoidable by other means
-- Force used must be proportionate to the threat"""
-    
-    elif section == "76":
-        return """Act Done by a Person Bound by Law:
+- Force used must be proportionate to the threat""",
+
+    "76": """Act Done by a Person Bound by Law:
 - No offense if the act is done by a person who is bound by law to do it
-- The person must believe in good faith that they are bound by law to do the act"""
-    
-    elif section == "79":
-        return """Act Done by a Person Justified by Law:
+- The person must believe in good faith that they are bound by law to do the act""",
+
+    "79": """Act Done by a Person Justified by Law:
 - No offense if the act is justified by law
 - The person must believe in good faith that they are justified by law to do the act"""
+}
+
+def get_section_explanation(section, case_text):
+    # Check for special case scenarios
+    if _SELF_DEFENSE.search(case_text):
+        return get_self_defense_explanation(case_text)
     
-    else:
-        return f"Section {section} of the Indian Penal Code"
+    case_lower = case_text.lower()
+    if "minimum wage" in case_lower or "labor" in case_lower or "employer" in case_lower:
+        return get_labor_law_explanation(case_text)
+    
+    # General section explanations
+    return _EXPLANATIONS.get(section, f"Section {section} of the Indian Penal Code")
 
 def get_self_defense_explanation(case_text):
     return """It depends on the circumstances. If Person B kills Person A in self-defense to protect himself, then Person B would NOT be considered guilty of murder or culpable homicide.
@@ -246,6 +350,9 @@ def main():
     print("Example: 'The accused stole a laptop from the office'")
     print("Example: 'Person A murdered Person B by stabbing multiple times'")
     
+    # Load the model while the user reads the banner and types
+    threading.Thread(target=_warm_up, daemon=True).start()
+    
     while True:
         print("\n> ", end="")
         user_input = input().strip()
@@ -0,0 +1,164 @@
+import json
+import os
+import pickle
+import joblib
+import numpy as np
+from safetensors.numpy import load_file, save_file
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer, TfidfVectorizer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import LabelEncoder
+from compact_forest import CompactForest
+from compiled_forest import TREELITE_AVAILABLE, compile_forest
+
+# Vectorizer parameters that affect transform() and can be stored as JSON
+VECTORIZER_PARAMS = (
+    'lowercase', 'strip_accents', 'token_pattern', 'stop_words', 'ngram_range',
+    'binary', 'norm', 'use_idf', 'smooth_idf', 'sublinear_tf'
+)
+HASHING_PARAMS = (
+    'n_features', 'alternate_sign', 'lowercase', 'strip_accents', 'token_pattern',
+    'stop_words', 'ngram_range', 'binary', 'norm'
+)
+TFIDF_PARAMS = ('norm', 'use_idf', 'smooth_idf', 'sublinear_tf')
+
+def make_hashing_vectorizer(n_features=2 ** 18, ngram_range=(1, 2)):
+    """TF-IDF over hashed terms; transform() hashes each term instead of looking it up in a vocabulary"""
+    return Pipeline([
+        ('hashing', HashingVectorizer(n_features=n_features, ngram_range=ngram_range, alternate_sign=False, norm=None)),
+        ('tfidf', TfidfTransformer())
+    ])
+
+def _json_params(estimator, names):
+    params = estimator.get_params()
+    return {name: params[name] for name in names}
+
+def save_vectorizer(vectorizer, path='tfidf_vectorizer.json', idf_path='tfidf_idf.safetensors'):
+    """Save a fitted TF-IDF vectorizer as JSON parameters (and vocabulary) plus raw IDF weights"""
+    if isinstance(vectorizer, Pipeline):
+        # Hashing pipeline from make_hashing_vectorizer(); only the IDF weights are learned
+        tfidf = vectorizer.named_steps['tfidf']
+        vectorizer_data = {
+            'type': 'hashing',
+            'params': _json_params(vectorizer.named_steps['hashing'], HASHING_PARAMS),
+            'tfidf_params': _json_params(tfidf, TFIDF_PARAMS)
+        }
+        idf = tfidf.idf_
+    else:
+        vectorizer_data = {
+            'type': 'tfidf',
+            'params': _json_params(vectorizer, VECTORIZER_PARAMS),
+            'vocabulary_': {term: int(index) for term, index in vectorizer.vocabulary_.items()}
+        }
+        idf = vectorizer.idf_
+
+    with open(path, 'w') as f:
+        json.dump(vectorizer_data, f)
+
+    save_file({'idf': np.asarray(idf, dtype=np.float64)}, idf_path)
+
+def load_vectorizer(path='tfidf_vectorizer.json', idf_path='tfidf_idf.safetensors'):
+    """Rebuild a fitted TF-IDF vectorizer without unpickling it"""
+    with open(path, 'r') as f:
+        vectorizer_data = json.load(f)
+
+    params = vectorizer_data['params']
+    params['ngram_range'] = tuple(params['ngram_range'])
+    idf = load_file(idf_path)['idf']
+
+    if vectorizer_data['type'] == 'hashing':
+        vectorizer = Pipeline([
+            ('hashing', HashingVectorizer(**params)),
+            ('tfidf', TfidfTransformer(**vectorizer_data['tfidf_params']))
+        ])
+        vectorizer.named_steps['tfidf'].idf_ = idf
+        return vectorizer
+
+    # A vocabulary passed to the constructor is treated as fixed, so only the
+    # IDF weights need to be restored for transform() to work
+    vectorizer = TfidfVectorizer(vocabulary=vectorizer_data['vocabulary_'], **params)
+    vectorizer.idf_ = idf
+
+    return vectorizer
+
+def save_label_encoder(label_encoder, path='label_encoder.json'):
+    """Save the label encoder classes as a JSON list"""
+    with open(path, 'w') as f:
+        json.dump(label_encoder.classes_.tolist(), f)
+
+def load_label_encoder(path='label_encoder.json'):
+    """Rebuild the label encoder from its JSON list of classes"""
+    with open(path, 'r') as f:
+        classes = json.load(f)
+
+    label_encoder = LabelEncoder()
+    label_encoder.classes_ = np.array(classes, dtype=object)
+
+    return label_encoder
+
+def save_forest(clf, path='rf_forest.safetensors', manifest_path='rf_forest.json'):
+    """Save the trees of a fitted RandomForestClassifier as concatenated node arrays plus a JSON manifest"""
+    trees = [estimator.tree_ for estimator in clf.estimators_]
+    save_file({
+        'offsets': np.cumsum([0] + [tree.node_count for tree in trees]).astype(np.int64),
+        'children_left': np.concatenate([tree.children_left for tree in trees]).astype(np.int64),
+        'children_right': np.concatenate([tree.children_right for tree in trees]).astype(np.int64),
+        'feature': np.concatenate([tree.feature for tree in trees]).astype(np.int64),
+        'threshold': np.concatenate([tree.threshold for tree in trees]).astype(np.float64),
+        'value': np.concatenate([tree.value[:, 0, :] for tree in trees]).astype(np.float64)
+    }, path)
+
+    manifest = {
+        'n_estimators': len(trees),
+        'n_features_in_': int(clf.n_features_in_),
+        'classes_': clf.classes_.tolist()
+    }
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f)
+
+def load_forest_manifest(manifest_path='rf_forest.json'):
+    """Read the forest manifest (number of trees, input width, and classes)"""
+    with open(manifest_path, 'r') as f:
+        return json.load(f)
+
+def load_forest(path='rf_forest.safetensors', manifest_path='rf_forest.json'):
+    """Build a CompactForest from saved node arrays without unpickling anything"""
+    manifest = load_forest_manifest(manifest_path)
+    arrays = load_file(path)
+
+    # Split the concatenated arrays back into one slice per tree
+    bounds = arrays['offsets']
+    per_tree = {
+        name: [arrays[name][start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+        for name in ('children_left', 'children_right', 'feature', 'threshold', 'value')
+    }
+
+    return CompactForest.from_arrays(manifest['classes_'], manifest['n_features_in_'], **per_tree)
+
+def main():
+    """Convert pickled components to the formats analyze_case.py loads, and build the compiled forest if treelite is installed"""
+    if os.path.exists('tfidf_vectorizer.pkl'):
+        with open('tfidf_vectorizer.pkl', 'rb') as f:
+            vectorizer = pickle.load(f)
+        save_vectorizer(vectorizer)
+        print("Saved tfidf_vectorizer.json and tfidf_idf.safetensors")
+
+    if os.path.exists('label_encoder.pkl'):
+        with open('label_encoder.pkl', 'rb') as f:
+            label_encoder = pickle.load(f)
+        save_label_encoder(label_encoder)
+        print("Saved label_encoder.json")
+
+    if os.path.exists('rf_classifier.pkl'):
+        clf = joblib.load('rf_classifier.pkl')
+        save_forest(clf)
+        print("Saved rf_forest.safetensors and rf_forest.json")
+
+        if TREELITE_AVAILABLE:
+            compile_forest(clf)
+            print("Saved rf_classifier.so")
+        else:
+            print("treelite not available. Install with: pip install treelite tl2cgen")
+            print("analyze_case.py will use the pure NumPy forest predictor")
+
+if __name__ == "__main__":
+    main()